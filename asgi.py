@@ -0,0 +1,237 @@
+"""ASGI entry point for OrbitWell.
+
+Run with any ASGI server, e.g.::
+
+    uvicorn asgi:application --workers 4
+
+The Flask routes are unchanged: each request's handler, including its SQLite
+work, runs on a bounded thread pool, while reading the request body and
+writing the response happen on the event loop. A thread is only held while
+the app is producing a chunk, never while waiting on a slow client, so one
+worker can hold thousands of slow connections with ORBITWELL_ASGI_THREADS
+threads. Streaming responses (NDJSON exports, event streams) are pulled from
+the app one chunk at a time, and stop as soon as the client disconnects.
+
+``GET /api/reminders/events`` is the exception: it stays open as long as a
+page does, so it is served here on the event loop rather than by Flask. Each
+stream waits on an asyncio queue that the reminder scheduler fills through
+``loop.call_soon_threadsafe``, so open pages hold no threads at all.
+"""
+import asyncio
+import contextvars
+import os
+import queue
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from app import REMINDER_EVENTS_KEEPALIVE, create_app, sse_event
+
+flask_app = create_app()
+ASGI_THREADS = int(os.environ.get('ORBITWELL_ASGI_THREADS', flask_app.config['DB_POOL_SIZE']))
+# Request bodies larger than this are spooled to a temporary file
+MAX_MEMORY_BODY = 1024 * 1024
+
+
+class WSGIAdapter:
+    """Serve a WSGI application over ASGI using a bounded thread pool."""
+
+    def __init__(self, wsgi_app, max_threads=ASGI_THREADS):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='orbitwell-asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.handle_http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.handle_lifespan(receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(max_size=MAX_MEMORY_BODY)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    def build_environ(self, scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = name
+            else:
+                key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+    async def handle_http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        # Every call for this request runs in one context, so Flask's request
+        # context survives streamed responses that resume on other threads
+        context = contextvars.copy_context()
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('started'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        def call(fn, *args):
+            return loop.run_in_executor(self.executor, context.run, fn, *args)
+
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            result = await call(self.wsgi_app, self.build_environ(scope, body), start_response)
+            try:
+                chunks = iter(result)
+                while True:
+                    next_chunk = call(next, chunks, None)
+                    await asyncio.wait((next_chunk, disconnected), return_when=asyncio.FIRST_COMPLETED)
+                    if disconnected.done():
+                        # A chunk being produced cannot be interrupted; let it
+                        # finish, drop it, then close the iterator below
+                        await asyncio.gather(next_chunk, return_exceptions=True)
+                        return
+                    chunk = next_chunk.result()
+                    if chunk is None:
+                        break
+                    if not chunk:
+                        continue
+                    await self.start(send, response)
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                await self.start(send, response)
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            finally:
+                if hasattr(result, 'close'):
+                    await call(result.close)
+        finally:
+            disconnected.cancel()
+            body.close()
+
+    @staticmethod
+    async def start(send, response):
+        if not response.get('started'):
+            response['started'] = True
+            await send({'type': 'http.response.start', 'status': response['status'],
+                        'headers': response['headers']})
+
+
+class EventLoopSubscription:
+    """A scheduler subscription delivering into an asyncio queue on ``loop``."""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def put_nowait(self, item):
+        # Called from the scheduler thread; the queue itself is only touched on the loop
+        if self.queue.full():
+            raise queue.Full
+        self.loop.call_soon_threadsafe(self._put, item)
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:  # Filled up since the check above; the event is dropped
+            pass
+
+
+class ReminderEventStream:
+    """``GET /api/reminders/events`` (see app.api_reminder_events) without a thread per stream."""
+
+    path = '/api/reminders/events'
+
+    def __init__(self, scheduler, keepalive=REMINDER_EVENTS_KEEPALIVE):
+        self.scheduler = scheduler
+        self.keepalive = keepalive
+
+    async def __call__(self, scope, receive, send):
+        subscription = self.scheduler.subscribe(
+            EventLoopSubscription(asyncio.get_running_loop(), self.scheduler.subscriber_queue_size))
+        disconnected = asyncio.ensure_future(WSGIAdapter.wait_for_disconnect(receive))
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ]})
+            await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+            while True:
+                due = asyncio.ensure_future(subscription.queue.get())
+                await asyncio.wait((due, disconnected), timeout=self.keepalive,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    due.cancel()
+                    return
+                if due.done():
+                    chunk = sse_event('due', due.result())
+                else:
+                    due.cancel()
+                    chunk = ': keepalive\n\n'
+                await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+        finally:
+            self.scheduler.unsubscribe(subscription)
+            disconnected.cancel()
+
+
+class Application:
+    """Routes reminder event streams to ReminderEventStream and everything else to Flask."""
+
+    def __init__(self, wsgi, reminder_events):
+        self.wsgi = wsgi
+        self.reminder_events = reminder_events
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] == self.reminder_events.path:
+            await self.reminder_events(scope, receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+
+application = Application(WSGIAdapter(flask_app),
+                          ReminderEventStream(flask_app.extensions['orbitwell'].reminder_scheduler))
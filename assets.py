@@ -0,0 +1,138 @@
+"""Fingerprinted, precompressed static assets.
+
+At startup ``AssetPipeline.build`` hashes every file under the static folder
+and writes a copy named after its content hash (``app.3f9a2c1d0b7e.js``) to a
+build directory, together with ``.gz``/``.br`` siblings for text assets.
+``url_for('static', filename=...)`` is rewritten to the hashed name, so
+templates need no changes. Hashed URLs never change meaning and are served
+with an immutable, year-long Cache-Control. Anything else under ``/static``
+(e.g. paths built in JavaScript) is served from the original file with ETag
+revalidation. Both paths support HTTP byte ranges through werkzeug's
+``send_file``, so the music player can seek without downloading whole MP3s.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+
+import http_cache
+from http_cache import compress_variants, negotiate_encoding
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.html', '.txt', '.map'}
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def atomic_write(path, data):
+    """Write ``data`` so concurrent readers (or workers building at once) never see a partial file."""
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def hashed_name(filename, digest):
+    root, ext = os.path.splitext(filename)
+    return f'{root}.{digest}{ext}'
+
+
+class AssetPipeline:
+    """Builds and serves fingerprinted copies of a Flask app's static files."""
+
+    def __init__(self, static_folder, build_folder):
+        self.static_folder = static_folder
+        self.build_folder = build_folder
+        self.manifest = {}   # logical filename -> hashed filename
+        self.sources = {}    # hashed filename -> logical filename
+        self.encodings = {}  # hashed filename -> encodings with a sibling on disk
+
+    def build(self):
+        """Fingerprint every static file, writing only outputs that are missing."""
+        os.makedirs(self.build_folder, exist_ok=True)
+        manifest = {}
+        encodings = {}
+        for root, _, files in os.walk(self.static_folder):
+            for name in files:
+                source = os.path.join(root, name)
+                filename = os.path.relpath(source, self.static_folder).replace(os.sep, '/')
+                target_name = hashed_name(filename, fingerprint(source))
+                manifest[filename] = target_name
+                encodings[target_name] = self._write(source, target_name)
+
+        self._prune(manifest.values())
+        atomic_write(os.path.join(self.build_folder, 'manifest.json'),
+                     json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+
+        self.manifest = manifest
+        self.sources = {hashed: logical for logical, hashed in manifest.items()}
+        self.encodings = encodings
+        return manifest
+
+    def _write(self, source, target_name):
+        target = os.path.join(self.build_folder, target_name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if not os.path.exists(target):
+            with open(source, 'rb') as f:
+                atomic_write(target, f.read())
+
+        if os.path.splitext(target_name)[1] not in COMPRESSIBLE_EXTENSIONS:
+            return []
+        wanted = ['br', 'gzip'] if http_cache.brotli is not None else ['gzip']
+        missing = [e for e in wanted if not os.path.exists(target + ENCODING_SUFFIXES[e])]
+        if missing:
+            with open(target, 'rb') as f:
+                variants = compress_variants(f.read())
+            for encoding, data in variants.items():
+                atomic_write(target + ENCODING_SUFFIXES[encoding], data)
+        return [e for e, suffix in ENCODING_SUFFIXES.items() if os.path.exists(target + suffix)]
+
+    def _prune(self, current):
+        """Delete hashed files (and siblings) left over from older builds."""
+        keep = set()
+        for name in current:
+            path = os.path.normpath(os.path.join(self.build_folder, name))
+            keep.update([path] + [path + suffix for suffix in ENCODING_SUFFIXES.values()])
+        for root, _, files in os.walk(self.build_folder):
+            for name in files:
+                path = os.path.normpath(os.path.join(root, name))
+                if name != 'manifest.json' and not name.endswith('.tmp') and path not in keep:
+                    os.remove(path)
+
+    def url_defaults(self, endpoint, values):
+        """Point ``url_for('static', filename=...)`` at the fingerprinted copy."""
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.manifest.get(values['filename'], values['filename'])
+
+    def serve(self, filename):
+        """View function replacing Flask's default ``static`` endpoint."""
+        if filename not in self.sources:
+            return send_from_directory(self.static_folder, filename, conditional=True)
+
+        mimetype = mimetypes.guess_type(self.sources[filename])[0] or 'application/octet-stream'
+        # Ranges refer to the identity bytes, so only whole-body requests get a compressed copy
+        encoding = None if request.range else negotiate_encoding(self.encodings.get(filename, ()))
+        if encoding:
+            response = send_from_directory(self.build_folder, filename + ENCODING_SUFFIXES[encoding],
+                                           mimetype=mimetype, conditional=True)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_from_directory(self.build_folder, filename, mimetype=mimetype, conditional=True)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        if self.encodings.get(filename):
+            response.vary.add('Accept-Encoding')
+        return response
+
+    def init_app(self, app):
+        self.build()
+        app.url_defaults(self.url_defaults)
+        app.view_functions['static'] = self.serve
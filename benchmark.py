@@ -0,0 +1,471 @@
+"""Benchmarks and load tests for the OrbitWell API.
+
+In-process, through Flask's test client (seeds a scratch database in a
+temporary directory, so orbitwell.db is never touched)::
+
+    python benchmark.py client --journal-sizes 1000,100000,1000000 --output results.json
+
+Over HTTP against a running server, from several processes at once::
+
+    python benchmark.py seed --database /srv/orbitwell/orbitwell.db --journal-rows 100000
+    python benchmark.py http --url http://127.0.0.1:5000 --processes 4 --server-pid 1234 \
+        --journal-db /srv/orbitwell/orbitwell.db
+
+Comparing two runs, e.g. before and after a commit::
+
+    python benchmark.py compare baseline.json results.json --threshold 1.2
+
+Every scenario reports p50/p95/p99 latency, throughput and the RSS of the
+process serving the requests. ``compare`` exits with status 1 when any
+scenario's p95 grew by more than the threshold.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlencode, urlsplit
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then left out
+    resource = None
+
+from db import connect
+from migrations import migrate
+
+JOURNAL_WORDS = ('today', 'grateful', 'walked', 'orbit', 'stars', 'coffee', 'friend', 'tired', 'calm',
+                 'work', 'music', 'rain', 'sunset', 'planet', 'dream', 'family', 'anxious', 'proud',
+                 'garden', 'telescope', 'breathing', 'ocean', 'book', 'quiet', 'morning', 'night')
+ASK_TEMPLATES = ('{}', "I've been feeling {} lately", 'can you tell me about {}?', 'what about {} today')
+FALLBACK_MESSAGES = ('what should I cook tonight', 'hello there', 'how tall is a giraffe',
+                     'tell me something', 'ok', 'what time is it')
+ASK_SESSIONS = 50
+ASK_BATCH_ITEMS = 50
+SEED_BATCH_SIZE = 10000
+
+
+# ========================================
+# SEEDING
+# ========================================
+
+def seed_journal(db, rows, rng):
+    """Grow ``journal_entries`` to ``rows`` entries, one per minute going back from now."""
+    existing = db.execute('SELECT COUNT(*) FROM journal_entries').fetchone()[0]
+    now = datetime.now()
+    with db:
+        for start in range(existing, rows, SEED_BATCH_SIZE):
+            db.executemany('INSERT INTO journal_entries (content, created_at) VALUES (?, ?)', (
+                (' '.join(rng.choices(JOURNAL_WORDS, k=rng.randint(8, 40))),
+                 (now - timedelta(minutes=n)).strftime('%Y-%m-%d %H:%M:%S'))
+                for n in range(start, min(start + SEED_BATCH_SIZE, rows))
+            ))
+
+
+def seed_reminders(db, history_days, per_day, active, rng):
+    """Add ``per_day`` completed reminders for each of the last ``history_days`` days plus ``active`` open ones."""
+    now = datetime.now()
+    completed = ((f'Reminder {day}-{n}', '', (now - timedelta(days=day)).isoformat(), 'custom', True,
+                  (now - timedelta(days=day, minutes=rng.randint(0, 600))).isoformat(),
+                  (now - timedelta(days=day + 1)).isoformat())
+                 for day in range(history_days) for n in range(per_day))
+    open_ = ((f'Upcoming {n}', '', (now + timedelta(hours=n)).isoformat(), 'custom', False, None, now.isoformat())
+             for n in range(active))
+    with db:
+        for rows in (completed, open_):
+            db.executemany('''INSERT INTO reminders
+                              (title, description, datetime, category, completed, completed_at, created_at)
+                              VALUES (?, ?, ?, ?, ?, ?, ?)''', rows)
+
+
+def corpus_keywords(path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'corpus.json')):
+    """The keyword list of every intent in the assistant corpus."""
+    with open(path, 'rb') as f:
+        return [intent['keywords'] for intent in json.load(f)['intents']]
+
+
+def ask_messages(keywords, count, rng):
+    """A reproducible mix of messages: mostly intent keywords, some that fall through."""
+    messages = []
+    for _ in range(count):
+        if rng.random() < 0.2:
+            messages.append(rng.choice(FALLBACK_MESSAGES))
+        else:
+            keyword = rng.choice(rng.choice(keywords))
+            messages.append(rng.choice(ASK_TEMPLATES).format(keyword))
+    return messages
+
+
+# ========================================
+# SCENARIOS
+# ========================================
+# A scenario is (name, step); step(send, i) issues exactly one request via
+# send(method, path, body=None) -> (status, payload).
+
+def ask_scenarios(messages):
+    def ask(send, i):
+        return send('POST', '/api/ask', {'session_id': f'bench-{i % ASK_SESSIONS}',
+                                         'message': messages[i % len(messages)]})
+
+    def ask_stream(send, i):
+        return send('POST', '/api/ask/stream', {'session_id': f'bench-{i % ASK_SESSIONS}',
+                                                'message': messages[i % len(messages)]})
+
+    def ask_batch(send, i):
+        items = [{'session_id': f'bench-batch-{n % 10}', 'message': messages[(i + n) % len(messages)]}
+                 for n in range(ASK_BATCH_ITEMS)]
+        return send('POST', '/api/ask/batch', {'items': items, 'seed': i})
+
+    return [('ask', ask), ('ask_stream', ask_stream), ('ask_batch', ask_batch),
+            ('session_stats', lambda send, i: send('GET', '/api/session-stats')),
+            ('knowledge_base', lambda send, i: send('GET', '/api/knowledge-base'))]
+
+
+def reminder_scenarios():
+    created = []
+
+    def create(send, i):
+        status, payload = send('POST', '/api/reminders', {'title': f'Benchmark {i}',
+                                                          'datetime': datetime.now().isoformat()})
+        if status < 400:
+            created.append(payload['reminder']['id'])
+        return status, payload
+
+    def update(send, i):
+        return send('PUT', f'/api/reminders/{created[i % len(created)]}', {'completed': True})
+
+    def delete(send, i):
+        return send('DELETE', f'/api/reminders/{created.pop()}')
+
+    return [('reminder_stats', lambda send, i: send('GET', '/reminder-stats')),
+            ('reminders_create', create),
+            ('reminders_update', update),
+            ('reminders_list', lambda send, i: send('GET', '/api/reminders')),
+            ('reminders_delete', delete)]
+
+
+def journal_scenarios(deep_cursor):
+    terms = ('grateful', 'telescope sunset', 'calm morning', 'orb*')
+    return [('journal_page', lambda send, i: send('GET', '/api/journal')),
+            ('journal_page_deep', lambda send, i: send('GET', '/api/journal?' + urlencode({'before': deep_cursor}))),
+            ('journal_search', lambda send, i: send('GET', '/api/journal/search?' +
+                                                    urlencode({'q': terms[i % len(terms)]})))]
+
+
+def deep_journal_cursor(db):
+    """Cursor pointing half way into the journal, or '' when it is empty."""
+    count = db.execute('SELECT COUNT(*) FROM journal_entries').fetchone()[0]
+    row = db.execute('SELECT id, created_at FROM journal_entries ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?',
+                     (count // 2,)).fetchone()
+    return f"{row['created_at']},{row['id']}" if row else ''
+
+
+# ========================================
+# MEASUREMENT
+# ========================================
+
+def rss_mb(pid=None):
+    """Current resident set size of ``pid`` (default: this process) in MB, or None if unknown."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20, 1)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(name, latencies, errors, elapsed, **extra):
+    latencies = sorted(latencies)
+    ms = lambda seconds: None if seconds is None else round(seconds * 1000, 3)
+    result = {
+        'name': name,
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'max_ms': ms(latencies[-1]) if latencies else None,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+    }
+    result.update(extra)
+    return result
+
+
+def timed_run(send, step, requests, warmup):
+    """Run ``step`` ``requests`` times after ``warmup`` untimed calls; return (latencies, errors, elapsed)."""
+    for i in range(warmup):
+        step(send, i)
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(requests):
+        t0 = time.perf_counter()
+        status, _ = step(send, warmup + i)
+        latencies.append(time.perf_counter() - t0)
+        errors += status >= 400
+    return latencies, errors, time.perf_counter() - started
+
+
+def run_metadata(mode, args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'mode': mode,
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('func', 'mode', 'output')},
+    }
+
+
+def write_results(results, output):
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+def print_progress(result):
+    rows = f" ({result['journal_rows']} rows)" if 'journal_rows' in result else ''
+    print(f"{result['name']}{rows}: p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+          f"p99 {result['p99_ms']} ms, {result['throughput_rps']} req/s", file=sys.stderr)
+
+
+# ========================================
+# MODES
+# ========================================
+
+def run_client(args):
+    import app as orbitwell
+    flask_app = orbitwell.create_app({
+        'DATABASE': os.path.join(tempfile.mkdtemp(prefix='orbitwell-bench-'), 'orbitwell.db'),
+    })
+    client = flask_app.test_client()
+
+    def send(method, path, body=None):
+        response = client.open(path, method=method, json=body)
+        data = response.data  # Drains streamed responses
+        return response.status_code, response.get_json(silent=True) if response.is_json else data
+
+    rng = random.Random(args.seed)
+    db = connect(flask_app.config['DATABASE'])
+    seed_reminders(db, args.reminder_days, args.reminders_per_day, args.active_reminders, rng)
+
+    results = run_metadata('client', args)
+    results['scenarios'] = scenarios = []
+
+    def measure(name, step, **extra):
+        latencies, errors, elapsed = timed_run(send, step, args.requests, args.warmup)
+        scenarios.append(summarize(name, latencies, errors, elapsed,
+                                   rss_mb=rss_mb(), peak_rss_mb=peak_rss_mb(), **extra))
+        print_progress(scenarios[-1])
+
+    messages = ask_messages(corpus_keywords(flask_app.config['CORPUS_FILE']), 1000, rng)
+    for name, step in ask_scenarios(messages) + reminder_scenarios():
+        measure(name, step)
+
+    for rows in args.journal_sizes:
+        print(f'Seeding {rows} journal entries...', file=sys.stderr)
+        seed_journal(db, rows, rng)
+        for name, step in journal_scenarios(deep_journal_cursor(db)):
+            measure(name, step, journal_rows=rows)
+
+    write_results(results, args.output)
+
+
+def http_worker(args, barrier, queue, worker):
+    url = urlsplit(args.url)
+    connection_class = HTTPSConnection if url.scheme == 'https' else HTTPConnection
+    connection = connection_class(url.netloc, timeout=60)
+    prefix = url.path.rstrip('/')
+
+    def send(method, path, body=None):
+        headers = {'Accept-Encoding': 'gzip'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        connection.request(method, prefix + path, body=payload, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        if (response.getheader('Content-Type') or '').startswith('application/json') \
+                and not response.getheader('Content-Encoding'):
+            return response.status, json.loads(data)
+        return response.status, data
+
+    rng = random.Random(args.seed + worker)
+    messages = ask_messages(args.keywords, 1000, rng)
+    for name, step in ask_scenarios(messages) + reminder_scenarios() + journal_scenarios(args.deep_cursor):
+        barrier.wait()
+        started = time.time()
+        latencies, errors, _ = timed_run(send, step, args.requests, args.warmup)
+        queue.put((worker, name, latencies, errors, started, time.time()))
+    connection.close()
+
+
+def run_http(args):
+    # Messages are built from the intent keywords of the corpus
+    args.keywords = corpus_keywords()
+    args.deep_cursor = ''
+    if args.journal_db:
+        with closing(sqlite3.connect(f'file:{args.journal_db}?mode=ro', uri=True)) as db:
+            db.row_factory = sqlite3.Row
+            args.deep_cursor = deep_journal_cursor(db)
+
+    barrier = multiprocessing.Barrier(args.processes)
+    queue = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=http_worker, args=(args, barrier, queue, n))
+               for n in range(args.processes)]
+    for worker in workers:
+        worker.start()
+
+    order = []
+    collected = {}  # name -> [latencies, errors, first start, last end, reports]
+    expected = len(ask_scenarios([])) + len(reminder_scenarios()) + len(journal_scenarios(''))
+    for _ in range(expected * args.processes):
+        _, name, latencies, errors, started, ended = queue.get()
+        if name not in collected:
+            order.append(name)
+            collected[name] = [[], 0, started, ended, 0]
+        entry = collected[name]
+        entry[0].extend(latencies)
+        entry[1] += errors
+        entry[2] = min(entry[2], started)
+        entry[3] = max(entry[3], ended)
+        entry[4] += 1
+        if entry[4] == args.processes:
+            result = summarize(name, entry[0], entry[1], entry[3] - entry[2], rss_mb=rss_mb(args.server_pid))
+            collected[name] = result
+            print_progress(result)
+    for worker in workers:
+        worker.join()
+
+    results = run_metadata('http', args)
+    del results['config']['keywords'], results['config']['deep_cursor']
+    results['scenarios'] = [collected[name] for name in order]
+    write_results(results, args.output)
+
+
+def run_seed(args):
+    rng = random.Random(args.seed)
+    migrate(args.database)
+    db = connect(args.database)
+    seed_journal(db, args.journal_rows, rng)
+    seed_reminders(db, args.reminder_days, args.reminders_per_day, args.active_reminders, rng)
+    journal = db.execute('SELECT COUNT(*) FROM journal_entries').fetchone()[0]
+    reminders = db.execute('SELECT COUNT(*) FROM reminders').fetchone()[0]
+    print(f'Seeded {journal} journal entries and {reminders} reminders in {os.path.abspath(args.database)}')
+
+
+def run_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    if baseline['mode'] != current['mode']:
+        print(f"warning: comparing a {baseline['mode']} run with a {current['mode']} run", file=sys.stderr)
+    key = lambda result: (result['name'], result.get('journal_rows'))
+    previous = {key(result): result for result in baseline['scenarios']}
+    regressions = 0
+    print(f"{'scenario':<32} {'p95 before':>11} {'p95 after':>11} {'ratio':>7}")
+    for result in current['scenarios']:
+        before = previous.get(key(result))
+        label = result['name'] + (f" ({result['journal_rows']})" if result.get('journal_rows') else '')
+        if not before or not before['p95_ms'] or result['p95_ms'] is None:
+            print(f"{label:<32} {'-':>11} {str(result['p95_ms']):>11} {'new':>7}")
+            continue
+        ratio = result['p95_ms'] / before['p95_ms']
+        flag = '  REGRESSION' if ratio > args.threshold else ''
+        regressions += bool(flag)
+        print(f"{label:<32} {before['p95_ms']:>11} {result['p95_ms']:>11} {ratio:>7.2f}{flag}")
+    sys.exit(1 if regressions else 0)
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(',') if size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    def add_load_options(sub):
+        sub.add_argument('--requests', type=int, default=500, help='timed requests per scenario (per process)')
+        sub.add_argument('--warmup', type=int, default=20, help='untimed requests before each scenario')
+        sub.add_argument('--seed', type=int, default=1, help='random seed for generated data and messages')
+        sub.add_argument('--output', help='also write the JSON results to this file')
+
+    def add_seed_options(sub):
+        sub.add_argument('--reminder-days', type=int, default=1825, help='days of completed reminder history')
+        sub.add_argument('--reminders-per-day', type=int, default=3)
+        sub.add_argument('--active-reminders', type=int, default=50)
+
+    client = subparsers.add_parser('client', help="in-process benchmark through Flask's test client")
+    add_load_options(client)
+    add_seed_options(client)
+    client.add_argument('--journal-sizes', type=parse_sizes, default=[1000, 100000, 1000000],
+                        help='comma-separated journal sizes to benchmark, smallest first')
+    client.set_defaults(func=run_client)
+
+    http = subparsers.add_parser('http', help='multi-process load test against a running server')
+    add_load_options(http)
+    http.add_argument('--url', default='http://127.0.0.1:5000')
+    http.add_argument('--processes', type=int, default=4)
+    http.add_argument('--server-pid', type=int, help='report this local process as the server RSS')
+    http.add_argument('--journal-db', help="the server's database file, read to find a cursor half way "
+                                           "into the journal (otherwise journal_page_deep reads the first page)")
+    http.set_defaults(func=run_http)
+
+    seed = subparsers.add_parser('seed', help='fill a database for the http mode')
+    seed.add_argument('--database', default='orbitwell.db', help='database file to fill (created if missing)')
+    seed.add_argument('--journal-rows', type=int, default=100000)
+    seed.add_argument('--seed', type=int, default=1)
+    add_seed_options(seed)
+    seed.set_defaults(func=run_seed)
+
+    compare = subparsers.add_parser('compare', help='compare the p95 latencies of two result files')
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=1.2, help='p95 ratio counted as a regression')
+    compare.set_defaults(func=run_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""The assistant's response corpus: intents, replies and planet facts.
+
+The corpus lives in ``data/corpus.json``. Planet facts are the ``planet_*``
+entries of ``data/knowledge_base.json``, so that text exists in one place.
+Loading compiles the files into an immutable Corpus:
+
+* every reply is stored once in a single text blob, addressed through an
+  offset array, and intents refer to replies by index range;
+* all keywords are folded into one regex plus a keyword→intent priority
+  table, so classifying a message is a single scan.
+
+A request reads ``CorpusStore.get()`` once and uses that snapshot
+throughout. Reloading builds a complete new Corpus and swaps one reference,
+so no request ever sees half of an edit. The store notices edits by file
+modification time, checked at most every ``check_interval`` seconds, so
+workers pick up a new corpus without a restart; a file that fails to load
+is logged and the previous corpus stays in use.
+
+When the app is created before workers fork (``gunicorn --preload``), the
+corpus is a handful of large objects, so forked workers keep sharing its
+memory pages instead of copying them as reference counts change.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+PLANET_PREFIX = 'planet_'
+
+
+class Intent(NamedTuple):
+    name: str
+    type: str
+    protocol: tuple
+    responses: tuple    # (first reply index, count)
+    planet_facts: bool  # answer with the fact for a planet named in the message
+
+
+class Corpus:
+    """A compiled, read-only corpus; see the module docstring for the layout."""
+
+    def __init__(self, version, intents, keywords, replies, fallback, endings, planets):
+        self.version = version
+        self.intents = tuple(intents)
+        self.fallback = fallback  # (first reply index, count)
+        self.endings = endings    # (first reply index, count)
+        self.planets = tuple(planets)  # (planet name, reply index) in file order
+        self._text = ''.join(replies)
+        self._offsets = array('L', [0])
+        for reply in replies:
+            self._offsets.append(self._offsets[-1] + len(reply))
+
+        keyword_priority = {}
+        for priority, intent_keywords in enumerate(keywords):
+            for keyword in intent_keywords:
+                keyword_priority.setdefault(keyword, priority)
+        self.keyword_priority = keyword_priority
+        # Alternatives are ordered by priority and wrapped in a lookahead, so
+        # one scan of the message reports, for every position, the
+        # highest-priority keyword starting there
+        alternatives = sorted(keyword_priority, key=keyword_priority.get)
+        self.pattern = re.compile("(?=(%s))" % "|".join(re.escape(keyword) for keyword in alternatives))
+
+    def reply(self, index):
+        return self._text[self._offsets[index]:self._offsets[index + 1]]
+
+    def choose(self, span, rng):
+        """Pick one reply from a ``(first, count)`` span (consumes ``rng`` exactly like ``rng.choice``)."""
+        first, count = span
+        return self.reply(first + rng.randrange(count))
+
+    def classify(self, message_lower):
+        """Return the highest-priority intent matching the message, or None."""
+        best = None
+        for match in self.pattern.finditer(message_lower):
+            priority = self.keyword_priority[match.group(1)]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return self.intents[best] if best is not None else None
+
+    def planet_fact(self, message_lower):
+        """The fact for the first planet (in file order) named in the message, or None."""
+        for planet, index in self.planets:
+            if planet in message_lower:
+                return self.reply(index)
+        return None
+
+
+def load_corpus(path, knowledge_base_path):
+    """Read and compile the corpus files; raises ValueError if they are malformed."""
+    with open(path, 'rb') as f:
+        data = json.load(f)
+    with open(knowledge_base_path, 'rb') as f:
+        space_knowledge = json.load(f)['space_knowledge']
+
+    replies = []
+
+    def add(texts, what):
+        if not texts or not all(isinstance(text, str) for text in texts):
+            raise ValueError(f'{what} must be a non-empty list of strings')
+        first = len(replies)
+        replies.extend(texts)
+        return first, len(texts)
+
+    intents, keywords = [], []
+    for intent in data['intents']:
+        if not intent.get('keywords'):
+            raise ValueError(f"Intent {intent.get('name')!r} has no keywords")
+        keywords.append(intent['keywords'])
+        intents.append(Intent(
+            name=intent['name'],
+            type=intent.get('type', 'normal'),
+            protocol=tuple(intent.get('protocol', ())),
+            responses=add(intent['responses'], f"Responses of intent {intent['name']!r}"),
+            planet_facts=bool(intent.get('planet_facts')),
+        ))
+    fallback = add(data['fallback_responses'], 'fallback_responses')
+    endings = add(data['response_endings'], 'response_endings')
+    planets = []
+    for key, fact in space_knowledge.items():
+        if key.startswith(PLANET_PREFIX):
+            planets.append((key[len(PLANET_PREFIX):], add([fact], key)[0]))
+    return Corpus(data['version'], intents, keywords, replies, fallback, endings, planets)
+
+
+class CorpusStore:
+    """Holds the current Corpus and swaps in a new one when its files change."""
+
+    def __init__(self, path, knowledge_base_path, check_interval=2.0):
+        self.path = path
+        self.knowledge_base_path = knowledge_base_path
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.reload_errors = 0
+        self._lock = threading.Lock()
+        self._mtimes = self._stat()
+        self.current = load_corpus(path, knowledge_base_path)
+        self._next_check = time.monotonic() + check_interval
+
+    def _stat(self):
+        return tuple(os.stat(path).st_mtime_ns for path in (self.path, self.knowledge_base_path))
+
+    def get(self):
+        if self.check_interval and time.monotonic() >= self._next_check:
+            self._check()
+        return self.current
+
+    def _check(self):
+        # One thread checks while the others carry on with the current corpus
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                mtimes = self._stat()
+            except OSError:
+                return
+            if mtimes != self._mtimes:
+                # Remember the attempt even if it fails, so a broken file is
+                # reported once rather than on every check
+                self._mtimes = mtimes
+                self.reload()
+        finally:
+            self._lock.release()
+
+    def reload(self):
+        """Load the files again; returns False (keeping the current corpus) if they are invalid."""
+        try:
+            corpus = load_corpus(self.path, self.knowledge_base_path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.reload_errors += 1
+            logger.error('Keeping corpus version %s; reloading %s failed: %s', self.current.version, self.path, e)
+            return False
+        self.current = corpus
+        self.reloads += 1
+        logger.info('Loaded corpus version %s', corpus.version)
+        return True
@@ -0,0 +1,118 @@
+"""SQLite connection handling for OrbitWell.
+
+Connections are opened once, tuned with PRAGMAs and kept in a small pool.
+Each Flask app context (one per request) borrows a single connection and
+returns it on teardown, so a request never pays the connect cost twice and
+never leaks a handle.
+"""
+import queue
+import sqlite3
+import threading
+import time
+
+# sqlite3 keeps this many compiled statements per connection, so the fixed
+# SQL used by the routes is only prepared once per pooled connection.
+STATEMENT_CACHE_SIZE = 256
+
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',  # 256 MB
+    'PRAGMA cache_size=-16000',    # 16 MB
+    'PRAGMA temp_store=MEMORY',
+)
+
+
+def connect(path, autocommit=False):
+    """Open a connection with the standard PRAGMAs applied.
+
+    With ``autocommit`` every statement commits on its own unless an explicit
+    ``BEGIN`` is issued; otherwise sqlite3 opens transactions implicitly and
+    ``with db:`` commits them.
+    """
+    db = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                         cached_statements=STATEMENT_CACHE_SIZE,
+                         isolation_level=None if autocommit else '')
+    db.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        db.execute(pragma)
+    return db
+
+
+class InstrumentedConnection:
+    """Wraps a connection so every statement it executes is timed.
+
+    ``on_query(seconds)`` is called after each ``execute``, ``executemany``
+    and ``executescript``; everything else is passed through unchanged.
+    """
+
+    def __init__(self, connection, on_query):
+        self.connection = connection
+        self._on_query = on_query
+
+    def _timed(self, method, args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._on_query(time.perf_counter() - start)
+
+    def execute(self, *args):
+        return self._timed(self.connection.execute, args)
+
+    def executemany(self, *args):
+        return self._timed(self.connection.executemany, args)
+
+    def executescript(self, *args):
+        return self._timed(self.connection.executescript, args)
+
+    def __enter__(self):
+        self.connection.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.connection.__exit__(*exc_info)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+class ConnectionPool:
+    """A LIFO pool of open connections to one database file.
+
+    Recently used connections are handed out first so their page caches stay
+    warm. Connections beyond ``max_size`` are closed when released.
+    """
+
+    def __init__(self, path, max_size=8):
+        self.path = path
+        self.max_size = max_size
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self.opened += 1
+            return connect(self.path)
+
+    def release(self, db):
+        if db.in_transaction:
+            db.rollback()
+        try:
+            self._idle.put_nowait(db)
+        except queue.Full:
+            db.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        return {"opened": self.opened, "idle": self._idle.qsize(), "max_size": self.max_size}
@@ -0,0 +1,123 @@
+"""Responses that are serialized and compressed once, then served with ETags.
+
+A PrecomputedResponse keeps the identity, gzip and (when the optional
+``brotli`` package is installed) brotli encodings of a fixed body. Serving it
+is a dictionary lookup: the best encoding the client accepts is chosen,
+``If-None-Match`` is answered with 304 Not Modified, and long-lived
+Cache-Control headers let browsers skip the request entirely.
+
+PageCache applies the same idea to server-rendered pages whose output only
+depends on the template files.
+"""
+import gzip
+import hashlib
+import os
+
+from flask import Response, render_template, request
+from jinja2 import meta
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+DEFAULT_CACHE_CONTROL = 'public, max-age=86400'
+
+
+def compress_variants(body):
+    """Return ``{encoding: compressed_bytes}`` for the encodings worth serving."""
+    variants = {}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+def negotiate_encoding(available):
+    """Pick the preferred encoding in ``available`` that the client accepts, or None."""
+    for encoding in ('br', 'gzip'):
+        if encoding in available and request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+class PrecomputedResponse:
+    """A fixed response body served with a strong ETag and precompressed variants."""
+
+    def __init__(self, body, mimetype, cache_control=DEFAULT_CACHE_CONTROL):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        # Each encoding is a different byte sequence, so it gets its own strong ETag
+        self.variants = {None: (body, self.etag)}
+        for encoding, data in compress_variants(body).items():
+            self.variants[encoding] = (data, f'{self.etag}-{encoding}')
+
+    def make_response(self):
+        encoding = negotiate_encoding(self.variants)
+        body, etag = self.variants[encoding]
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=self.mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = self.cache_control
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+class PageCache:
+    """Rendered page templates kept as PrecomputedResponses.
+
+    Entries are keyed by endpoint (base.html highlights the active page),
+    template name and locale, and remember the modification times of the
+    template and every template it extends or includes. A page is rendered
+    again only when one of those files changes on disk.
+    """
+
+    def __init__(self, app, locales=('en',), cache_control='no-cache'):
+        self.app = app
+        self.locales = list(locales)
+        self.cache_control = cache_control
+        self._pages = {}  # (endpoint, template, locale) -> (files, mtimes, PrecomputedResponse)
+
+    def _template_files(self, template_name):
+        """Return the file of a template and of every template it references."""
+        env = self.app.jinja_env
+        source, filename, _ = env.loader.get_source(env, template_name)
+        files = [filename]
+        for referenced in meta.find_referenced_templates(env.parse(source)):
+            if referenced:
+                files.extend(self._template_files(referenced))
+        return files
+
+    @staticmethod
+    def _mtimes(files):
+        return tuple(os.stat(f).st_mtime_ns for f in files)
+
+    def get_locale(self):
+        return request.accept_languages.best_match(self.locales, default=self.locales[0])
+
+    def render(self, template_name):
+        locale = self.get_locale()
+        key = (request.endpoint, template_name, locale)
+        entry = self._pages.get(key)
+        if entry is None or self._mtimes(entry[0]) != entry[1]:
+            files = self._template_files(template_name)
+            mtimes = self._mtimes(files)
+            body = render_template(template_name, locale=locale)
+            entry = (files, mtimes, PrecomputedResponse(body, 'text/html', self.cache_control))
+            self._pages[key] = entry
+        return entry[2].make_response()
+
+    def warm(self, pages):
+        """Render each ``(path, template_name)`` page for every locale ahead of the first request."""
+        for path, template_name in pages:
+            for locale in self.locales:
+                with self.app.test_request_context(path, headers={'Accept-Language': locale}):
+                    self.render(template_name)
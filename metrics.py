@@ -0,0 +1,241 @@
+"""Request timing, SQL query counts and a Prometheus ``/metrics`` endpoint.
+
+``Metrics.init_app`` times every request from ``before_request`` until the
+request context is torn down, so streamed responses are timed to their last
+chunk, and records the result in per-route histograms. Routes are labelled by
+their URL rule (``/api/reminders/<int:reminder_id>``), never the raw path, so
+the number of series stays fixed. Statements run through an
+``InstrumentedConnection`` are counted against the current request.
+
+Profiling is opt-in: with ``ORBITWELL_PROFILE_RATE`` above 0 that fraction of
+requests is profiled with cProfile (or pyinstrument when
+``ORBITWELL_PROFILER=pyinstrument`` and the package is installed) and the
+report is written to ``instance/profiles``. Only one request is profiled at a
+time. Requests slower than ``slow_request_seconds`` are logged with their
+query count and, for the assistant, the intent that was matched.
+"""
+import bisect
+import cProfile
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+from flask import Response, g, has_request_context, request
+
+try:
+    import pyinstrument
+except ImportError:  # pyinstrument is optional; cProfile is always available
+    pyinstrument = None
+
+# Most routes answer in well under 5 ms, so the buckets start at 0.5 ms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing value per combination of label values."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values -> value
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labelvalues, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labelnames, labelvalues)), value
+
+
+class Histogram:
+    """Observations counted into cumulative ``le`` buckets per combination of label values."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {labelvalues: (list(counts), total) for labelvalues, (counts, total) in self._values.items()}
+        for labelvalues, (counts, total) in sorted(values.items()):
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', dict(labels, le=bound), cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+
+class Metrics:
+    """Registry of counters, histograms and callback collectors for one Flask app."""
+
+    def __init__(self, profile_rate=0.0, profiler='cprofile', slow_request_seconds=None):
+        self._metrics = []
+        self._collectors = []
+        self.profile_rate = profile_rate
+        self.profiler = profiler
+        self.profile_folder = None
+        self.slow_request_seconds = slow_request_seconds
+        self.logger = None
+        self._profile_lock = threading.Lock()
+
+        self.request_duration = self.histogram(
+            'orbitwell_request_duration_seconds', 'Time from the start of a request until its response is complete',
+            ('route', 'method'))
+        self.requests = self.counter('orbitwell_requests_total', 'Requests answered', ('route', 'method', 'status'))
+        self.sql_queries = self.histogram(
+            'orbitwell_sql_queries_per_request', 'SQLite statements executed by one request',
+            ('route',), QUERY_COUNT_BUCKETS)
+        self.sql_seconds = self.counter(
+            'orbitwell_sql_seconds_total', 'Time spent executing SQLite statements', ('route',))
+        self.intents = self.counter('orbitwell_ask_intents_total', 'Assistant replies by matched intent', ('intent',))
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, callback):
+        """Register ``callback`` to yield ``(name, type, help, labels, value)`` samples at scrape time."""
+        self._collectors.append(callback)
+        return callback
+
+    def record_query(self, seconds):
+        """Count one SQLite statement against the current request, if there is one."""
+        if has_request_context() and 'metrics_start' in g:
+            g.sql_queries += 1
+            g.sql_seconds += seconds
+
+    def record_intent(self, intent):
+        self.intents.inc(intent)
+        if has_request_context():
+            g.intent = intent
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(f'{name}{format_labels(labels)} {format_value(value)}'
+                         for name, labels, value in metric.samples())
+        described = set()
+        for callback in self._collectors:
+            for name, kind, documentation, labels, value in callback():
+                if name not in described:
+                    described.add(name)
+                    lines.append(f'# HELP {name} {documentation}')
+                    lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    # Request hooks
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_seconds = 0.0
+        if self.profile_rate and random.random() < self.profile_rate and self._profile_lock.acquire(blocking=False):
+            g.profiler = self._start_profiler()
+
+    def _after_request(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exception):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        status = g.pop('metrics_status', 500)
+        self.request_duration.observe(duration, route, request.method)
+        self.requests.inc(route, request.method, str(status))
+        self.sql_queries.observe(g.sql_queries, route)
+        self.sql_seconds.inc(route, amount=g.sql_seconds)
+        if self.slow_request_seconds is not None and duration >= self.slow_request_seconds:
+            self.logger.warning('Slow request: %s %s took %.1f ms (%d queries, %.1f ms in SQLite, intent %s)',
+                                request.method, route, duration * 1000, g.sql_queries, g.sql_seconds * 1000,
+                                g.get('intent', '-'))
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            try:
+                self._save_profile(profiler, route)
+            finally:
+                self._profile_lock.release()
+
+    # Profiling
+
+    def _start_profiler(self):
+        if self.profiler == 'pyinstrument' and pyinstrument is not None:
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _save_profile(self, profiler, route):
+        os.makedirs(self.profile_folder, exist_ok=True)
+        name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{request.method}{route.replace('/', '_')}"
+        path = os.path.join(self.profile_folder, name)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            profiler.dump_stats(path + '.prof')
+        else:
+            profiler.stop()
+            with open(path + '.html', 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+
+    def metrics_view(self):
+        return Response(self.render(), content_type=CONTENT_TYPE, headers={'Cache-Control': 'no-store'})
+
+    def init_app(self, app):
+        self.profile_folder = os.path.join(app.instance_path, 'profiles')
+        self.logger = app.logger
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
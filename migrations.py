@@ -0,0 +1,187 @@
+"""Versioned schema migrations for orbitwell.db.
+
+The schema version is kept in ``PRAGMA user_version``. ``migrate`` compares it
+with ``len(MIGRATIONS)`` and, when the database is current (every start but
+the first after an upgrade), returns after that single read. Pending
+migrations run in one ``BEGIN IMMEDIATE`` transaction, so when several
+workers start at once exactly one applies them and the others find the
+database already migrated.
+
+Append new migrations to the end of MIGRATIONS; never edit or reorder one
+that has shipped.
+"""
+import logging
+import sqlite3
+
+from db import connect
+
+logger = logging.getLogger(__name__)
+
+
+def init_journal_search(db):
+    """Create the FTS5 index over journal entries and the triggers that keep it in sync.
+
+    Returns False when this SQLite build lacks FTS5, in which case search is
+    disabled. An index created for an existing journal is filled right away.
+    """
+    exists = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'journal_fts'").fetchone()
+    try:
+        db.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS journal_fts USING fts5(
+            content,
+            content='journal_entries',
+            content_rowid='id',
+            tokenize='porter unicode61'
+        )''')
+    except sqlite3.OperationalError as e:
+        logger.warning('Journal search disabled: %s', e)
+        return False
+    db.execute('''CREATE TRIGGER IF NOT EXISTS journal_entries_fts_insert AFTER INSERT ON journal_entries BEGIN
+        INSERT INTO journal_fts (rowid, content) VALUES (new.id, new.content);
+    END''')
+    db.execute('''CREATE TRIGGER IF NOT EXISTS journal_entries_fts_delete AFTER DELETE ON journal_entries BEGIN
+        INSERT INTO journal_fts (journal_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END''')
+    db.execute('''CREATE TRIGGER IF NOT EXISTS journal_entries_fts_update AFTER UPDATE OF content ON journal_entries BEGIN
+        INSERT INTO journal_fts (journal_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO journal_fts (rowid, content) VALUES (new.id, new.content);
+    END''')
+    if not exists:
+        rebuild_journal_search(db)
+    return True
+
+
+def rebuild_journal_search(db):
+    db.execute("INSERT INTO journal_fts (journal_fts) VALUES ('rebuild')")
+
+
+def journal_search_enabled(db):
+    return db.execute("SELECT 1 FROM sqlite_master WHERE name = 'journal_fts'").fetchone() is not None
+
+
+def create_schema(db):
+    """Version 1: everything created by the unversioned ``init_db`` of earlier releases.
+
+    Written to be safe on a database that already has some or all of it.
+    """
+    db.execute('''CREATE TABLE IF NOT EXISTS journal_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        content TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_journal_entries_created_at_id ON journal_entries(created_at, id)')
+    init_journal_search(db)
+    db.execute('''CREATE TABLE IF NOT EXISTS reminders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        datetime TEXT NOT NULL,
+        category TEXT DEFAULT 'custom',
+        completed BOOLEAN DEFAULT 0,
+        completed_at TIMESTAMP,
+        created_at TIMESTAMP
+    )''')
+    # Databases created before reminders moved out of memory lack these columns
+    columns = {row['name'] for row in db.execute('PRAGMA table_info(reminders)')}
+    if 'category' not in columns:
+        db.execute("ALTER TABLE reminders ADD COLUMN category TEXT DEFAULT 'custom'")
+    if 'created_at' not in columns:
+        db.execute('ALTER TABLE reminders ADD COLUMN created_at TIMESTAMP')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_reminders_completed ON reminders(completed)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_reminders_completed_at ON reminders(completed_at)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_reminders_datetime ON reminders(datetime)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_reminders_completed_day ON reminders(DATE(completed_at)) WHERE completed = 1')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders(datetime) WHERE completed = 0')
+
+
+def add_sync(db):
+    """Version 2: server copies of the browser's gratitude entries and streak, and the sync change log.
+
+    ``sync_changes`` keeps one row per synced item, re-inserted on every
+    change, so its AUTOINCREMENT ``version`` only grows and "everything since
+    version N" is a range scan. Deleted items keep their row as a tombstone.
+    Triggers fill it, so reminders changed through the REST routes are
+    synced too. ``key`` is declared without a type so reminder ids stay
+    integers and gratitude keys stay text.
+    """
+    db.execute('ALTER TABLE reminders ADD COLUMN client_id INTEGER')
+    db.execute('UPDATE reminders SET client_id = id')
+    db.execute('CREATE UNIQUE INDEX idx_reminders_client_id ON reminders(client_id)')
+    db.execute('''CREATE TABLE gratitude_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        content TEXT NOT NULL,
+        created_at TEXT NOT NULL UNIQUE
+    )''')
+    db.execute('CREATE TABLE sync_values (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+    db.execute('''CREATE TABLE sync_changes (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        key NOT NULL,
+        UNIQUE (kind, key)
+    )''')
+    db.execute('CREATE INDEX idx_sync_changes_kind_version ON sync_changes(kind, version)')
+    db.execute("INSERT INTO sync_changes (kind, key) SELECT 'reminder', client_id FROM reminders ORDER BY id")
+
+    # Reminders created through the REST routes have no client id; they use their row id
+    db.execute('''CREATE TRIGGER reminders_client_id AFTER INSERT ON reminders WHEN new.client_id IS NULL BEGIN
+        UPDATE reminders SET client_id = new.id WHERE id = new.id;
+    END''')
+    for kind, table, key in (('reminder', 'reminders', 'client_id'),
+                             ('gratitude', 'gratitude_entries', 'created_at'),
+                             ('value', 'sync_values', 'key')):
+        record = (f"DELETE FROM sync_changes WHERE kind = '{kind}' AND key = {{row}}.{key}; "
+                  f"INSERT INTO sync_changes (kind, key) VALUES ('{kind}', {{row}}.{key});")
+        db.execute(f'''CREATE TRIGGER {table}_sync_insert AFTER INSERT ON {table}
+                       WHEN new.{key} IS NOT NULL BEGIN {record.format(row='new')} END''')
+        db.execute(f'''CREATE TRIGGER {table}_sync_update AFTER UPDATE ON {table}
+                       WHEN new.{key} IS NOT NULL BEGIN {record.format(row='new')} END''')
+        db.execute(f'''CREATE TRIGGER {table}_sync_delete AFTER DELETE ON {table}
+                       WHEN old.{key} IS NOT NULL BEGIN {record.format(row='old')} END''')
+
+
+def random_server_client_ids(db):
+    """Version 3: reminders created through the REST routes get a random negative client id.
+
+    Using the row id collided with ids that browsers had already synced
+    (a browser may upload any id, and after a database is restored it
+    uploads ids that the restored AUTOINCREMENT hands out again), so the
+    insert failed on the UNIQUE index. Browsers number their reminders with
+    positive timestamps; these ids are negative and stay within JavaScript's
+    safe integers. Reminders that already have a client id keep it.
+    """
+    db.execute('DROP TRIGGER reminders_client_id')
+    db.execute('''CREATE TRIGGER reminders_client_id AFTER INSERT ON reminders WHEN new.client_id IS NULL BEGIN
+        UPDATE reminders SET client_id = -1 - (random() & 9007199254740990) WHERE id = new.id;
+    END''')
+
+
+MIGRATIONS = [
+    create_schema,
+    add_sync,
+    random_server_client_ids,
+]
+
+
+def schema_version(db):
+    return db.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(path):
+    """Bring the database at ``path`` up to date and return the number of migrations applied."""
+    db = connect(path, autocommit=True)
+    try:
+        if schema_version(db) >= len(MIGRATIONS):
+            return 0
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            version = schema_version(db)
+            for migration in MIGRATIONS[version:]:
+                migration(db)
+            # PRAGMA does not accept parameters; the value is an int we computed
+            db.execute(f'PRAGMA user_version = {len(MIGRATIONS)}')
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return len(MIGRATIONS) - version
+    finally:
+        db.close()
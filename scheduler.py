@@ -0,0 +1,144 @@
+"""Server-side reminder due times, pushed to browsers as Server-Sent Events.
+
+The scheduler thread never scans the reminders table. It asks the partial
+``idx_reminders_due`` index (active reminders ordered by datetime) for the
+first reminder after the last one it fired, sleeps until that moment, then
+publishes everything that has come due to every subscribed event stream.
+Changes made through ReminderStore wake it early; changes made by other
+worker processes are picked up within ``max_sleep`` seconds. The thread is
+started by the first subscription, so it runs only in processes that serve
+event streams, and never in a master process that forks workers after
+creating the app (threads do not survive fork).
+
+A subscription is anything with ``put_nowait`` that raises ``queue.Full``
+when its reader has fallen behind: a ``queue.Queue`` for the WSGI route, or
+the asyncio-backed subscription in asgi.py, which lets an open stream wait
+on the event loop instead of holding a thread.
+
+Reminder datetimes are naive local ISO strings (``2025-01-31T09:00``), as
+sent by the ``datetime-local`` input, so they are compared as text.
+"""
+import logging
+import queue
+import threading
+from datetime import datetime
+
+from db import connect
+
+logger = logging.getLogger(__name__)
+
+# Floor on the sleep between checks, so a due time that does not compare as
+# due yet (e.g. fractional seconds) cannot make the thread spin
+MIN_SLEEP = 0.25
+# Wait after a failed check (e.g. "database is locked" while other workers
+# write); doubles on each consecutive failure, up to max_sleep
+ERROR_BACKOFF = 1
+
+
+class ReminderScheduler:
+    """Publishes each active reminder once, when its ``datetime`` arrives."""
+
+    def __init__(self, path, to_dict, max_sleep=60, subscriber_queue_size=100, autostart=True):
+        self.path = path
+        self.to_dict = to_dict
+        self.max_sleep = max_sleep
+        self.subscriber_queue_size = subscriber_queue_size
+        self.autostart = autostart
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        # (datetime, id) of the last reminder published; reminders already
+        # overdue at startup are not replayed
+        self.watermark = (self._now(), 0)
+        self.published = 0
+        self.dropped = 0
+        self.errors = 0
+
+    @staticmethod
+    def _now():
+        return datetime.now().isoformat(timespec='seconds')
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                # Reminders that came due before anyone was listening are not replayed
+                self.watermark = (self._now(), 0)
+                self._thread = threading.Thread(target=self.run, name='orbitwell-reminder-scheduler', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        """Re-check the next due time, e.g. after a reminder was added, moved or deleted."""
+        self._wake.set()
+
+    def subscribe(self, subscription=None):
+        """Register ``subscription`` (a new bounded ``queue.Queue`` by default) for due reminders."""
+        if subscription is None:
+            subscription = queue.Queue(maxsize=self.subscriber_queue_size)
+        if self.autostart:
+            self.start()
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, reminder):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(reminder)
+            except queue.Full:  # A stalled client only misses its own events
+                self.dropped += 1
+        self.published += 1
+
+    def due(self, db, now):
+        return db.execute('''SELECT * FROM reminders INDEXED BY idx_reminders_due
+                             WHERE completed = 0 AND (datetime, id) > (?, ?) AND datetime <= ?
+                             ORDER BY datetime, id''', (*self.watermark, now)).fetchall()
+
+    def next_due(self, db):
+        """Seconds until the next active reminder is due, or None if there is none."""
+        row = db.execute('''SELECT datetime FROM reminders INDEXED BY idx_reminders_due
+                            WHERE completed = 0 AND (datetime, id) > (?, ?)
+                            ORDER BY datetime, id LIMIT 1''', self.watermark).fetchone()
+        if row is None:
+            return None
+        try:
+            return (datetime.fromisoformat(row['datetime']) - datetime.now()).total_seconds()
+        except (ValueError, TypeError):  # Unparseable or timezone-aware; fall back to max_sleep
+            return None
+
+    def run(self):
+        db = None
+        backoff = ERROR_BACKOFF
+        while True:
+            self._wake.clear()
+            try:
+                if db is None:
+                    db = connect(self.path, autocommit=True)
+                for row in self.due(db, self._now()):
+                    self.watermark = (row['datetime'], row['id'])
+                    self.publish(self.to_dict(row))
+                delay = self.next_due(db)
+            except Exception:
+                # Keep the thread alive: every event stream in this process depends on it
+                self.errors += 1
+                logger.exception('Reminder check failed; retrying in %s s', backoff)
+                if db is not None:
+                    db.close()
+                    db = None
+                self._wake.wait(backoff)
+                backoff = min(backoff * 2, self.max_sleep)
+                continue
+            backoff = ERROR_BACKOFF
+            self._wake.wait(self.max_sleep if delay is None else min(max(delay, MIN_SLEEP), self.max_sleep))
+
+    def stats(self):
+        with self._lock:
+            subscribers = len(self._subscribers)
+        return {"subscribers": subscribers, "published": self.published, "dropped": self.dropped,
+                "errors": self.errors}
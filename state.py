@@ -0,0 +1,276 @@
+"""Storage for per-user state shared by the OrbitWell routes.
+
+Conversation context has two backends: the in-memory store keeps it inside
+the current process and is the default, while the SQLite store keeps it in a
+WAL-mode database file so several worker processes (e.g. gunicorn workers)
+see one consistent view. Reminders always live in the SQLite database.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from db import connect
+
+
+# ========================================
+# SESSION CONTEXT
+# ========================================
+
+class SessionStore:
+    """Bounded per-session conversation history with LRU and TTL eviction.
+
+    Sessions are kept in least-recently-used order, so expired entries are
+    always at the front and can be dropped without scanning the whole store.
+    """
+
+    def __init__(self, max_entries, ttl, history_length):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.history_length = history_length
+        self._sessions = OrderedDict()  # session_id -> [last_seen, deque]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expire(self, now):
+        while self._sessions:
+            session_id, (last_seen, _) = next(iter(self._sessions.items()))
+            if now - last_seen <= self.ttl:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def _touch(self, session_id):
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            self.misses += 1
+            entry = [now, deque(maxlen=self.history_length)]
+            self._sessions[session_id] = entry
+            if len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            entry[0] = now
+            self._sessions.move_to_end(session_id)
+        return entry[1]
+
+    def append(self, session_id, role, content):
+        with self._lock:
+            self._touch(session_id).append({'role': role, 'content': content})
+
+    def history(self, session_id):
+        with self._lock:
+            return list(self._touch(session_id))
+
+    def close(self):
+        pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class SQLiteSessionStore:
+    """Session history kept in a WAL-mode SQLite table shared by all workers.
+
+    WAL lets readers proceed while one writer appends, and each update is a
+    short ``BEGIN IMMEDIATE`` transaction on a single row. Expired and
+    over-capacity sessions are pruned every ``prune_interval`` writes using
+    the ``last_seen`` index. Hit/miss/eviction counters are per process.
+    """
+
+    def __init__(self, path, max_entries, ttl, history_length, prune_interval=256):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.history_length = history_length
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        db = self._db()
+        db.execute('''CREATE TABLE IF NOT EXISTS session_context (
+            session_id TEXT PRIMARY KEY,
+            history TEXT NOT NULL,
+            last_seen REAL NOT NULL
+        )''')
+        db.execute('CREATE INDEX IF NOT EXISTS idx_session_context_last_seen ON session_context(last_seen)')
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = connect(self.path, autocommit=True)
+        return db
+
+    def _load(self, db, session_id, now):
+        row = db.execute('SELECT history, last_seen FROM session_context WHERE session_id = ?',
+                         (session_id,)).fetchone()
+        if row is not None and now - row['last_seen'] <= self.ttl:
+            self.hits += 1
+            return deque(json.loads(row['history']), maxlen=self.history_length)
+        if row is not None:
+            self.evictions += 1
+        self.misses += 1
+        return deque(maxlen=self.history_length)
+
+    def append(self, session_id, role, content):
+        db = self._db()
+        now = time.time()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            history = self._load(db, session_id, now)
+            history.append({'role': role, 'content': content})
+            db.execute('INSERT OR REPLACE INTO session_context (session_id, history, last_seen) VALUES (?, ?, ?)',
+                       (session_id, json.dumps(list(history)), now))
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        self._writes += 1
+        if self._writes % self.prune_interval == 0:
+            self.prune(now)
+
+    def history(self, session_id):
+        return list(self._load(self._db(), session_id, time.time()))
+
+    def close(self):
+        """Close this thread's connection; the next call on this thread opens a new one."""
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def prune(self, now=None):
+        """Drop expired sessions and the least recently used ones over capacity."""
+        now = time.time() if now is None else now
+        db = self._db()
+        expired = db.execute('DELETE FROM session_context WHERE last_seen < ?', (now - self.ttl,)).rowcount
+        overflow = db.execute('''DELETE FROM session_context WHERE session_id IN (
+            SELECT session_id FROM session_context ORDER BY last_seen DESC LIMIT -1 OFFSET ?
+        )''', (self.max_entries,)).rowcount
+        self.evictions += expired + overflow
+
+    def stats(self):
+        sessions = self._db().execute('SELECT COUNT(*) FROM session_context').fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+# ========================================
+# REMINDERS
+# ========================================
+
+REMINDER_FIELDS = ('title', 'description', 'datetime', 'category', 'completed', 'completed_at')
+
+
+class ReminderStore:
+    """Reminders kept in the ``reminders`` table and addressed by primary key.
+
+    ``get_connection`` returns the connection to use, normally the current
+    request's pooled connection from ``app.get_db``. ``on_change`` is called
+    after every write, e.g. to wake the reminder scheduler.
+    """
+
+    def __init__(self, get_connection, on_change=None):
+        self._get_connection = get_connection
+        self._on_change = on_change or (lambda: None)
+
+    @staticmethod
+    def to_dict(row):
+        reminder = {
+            "id": row['id'],
+            "title": row['title'],
+            "description": row['description'],
+            "datetime": row['datetime'],
+            "category": row['category'],
+            "completed": bool(row['completed']),
+            "created_at": row['created_at']
+        }
+        if row['completed_at'] is not None:
+            reminder["completed_at"] = row['completed_at']
+        return reminder
+
+    def iter_all(self):
+        """Yield every reminder in id order straight from the cursor."""
+        return (self.to_dict(row) for row in self._get_connection().execute('SELECT * FROM reminders ORDER BY id'))
+
+    def list(self):
+        return list(self.iter_all())
+
+    def get(self, reminder_id):
+        row = self._get_connection().execute('SELECT * FROM reminders WHERE id = ?', (reminder_id,)).fetchone()
+        return self.to_dict(row) if row else None
+
+    def add(self, title, datetime_str, description='', category='custom'):
+        with self._get_connection() as db:
+            cursor = db.execute('''INSERT INTO reminders (title, description, datetime, category, completed, created_at)
+                                   VALUES (?, ?, ?, ?, 0, ?)''',
+                                (title, description, datetime_str, category, datetime.now().isoformat()))
+        self._on_change()
+        return self.get(cursor.lastrowid)
+
+    def add_many(self, reminders):
+        """Insert an iterable of reminder dicts in one transaction and return the count.
+
+        The iterable is consumed lazily; if it raises, nothing is inserted.
+        """
+        rows = ((r['title'], r.get('description', ''), r['datetime'], r.get('category', 'custom'),
+                 bool(r.get('completed', False)), r.get('completed_at'),
+                 r.get('created_at') or datetime.now().isoformat())
+                for r in reminders)
+        with self._get_connection() as db:
+            count = db.executemany('''INSERT INTO reminders
+                                     (title, description, datetime, category, completed, completed_at, created_at)
+                                     VALUES (?, ?, ?, ?, ?, ?, ?)''', rows).rowcount
+        self._on_change()
+        return count
+
+    def update(self, reminder_id, changes):
+        """Apply ``changes`` and return the updated reminder, or None if it does not exist."""
+        fields = [field for field in changes if field in REMINDER_FIELDS]
+        if fields:
+            assignments = ', '.join(f'{field} = ?' for field in fields)
+            with self._get_connection() as db:
+                cursor = db.execute(f'UPDATE reminders SET {assignments} WHERE id = ?',
+                                    [changes[field] for field in fields] + [reminder_id])
+            if cursor.rowcount == 0:
+                return None
+            self._on_change()
+        return self.get(reminder_id)
+
+    def delete(self, reminder_id):
+        with self._get_connection() as db:
+            deleted = db.execute('DELETE FROM reminders WHERE id = ?', (reminder_id,)).rowcount > 0
+        if deleted:
+            self._on_change()
+        return deleted
+
+
+def make_session_store(backend, path, max_entries, ttl, history_length):
+    """Return the session store for the named backend."""
+    if backend == 'memory':
+        return SessionStore(max_entries, ttl, history_length)
+    if backend == 'sqlite':
+        return SQLiteSessionStore(path, max_entries, ttl, history_length)
+    raise ValueError(f"Unknown state backend: {backend!r} (expected 'memory' or 'sqlite')")
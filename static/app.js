@@ -11,6 +11,7 @@ class OrbitWellApp {
         this.breathingInterval = null;
         this.meditationInterval = null;
         this.countdownInterval = null;
+        this.journalCursor = null;
         // Generate or retrieve session ID for conversation context
         this.sessionId = localStorage.getItem('orbitwell_session_id') || `session_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
         localStorage.setItem('orbitwell_session_id', this.sessionId);
@@ -45,7 +46,9 @@ class OrbitWellApp {
                     }
 
                     // Create new audio object
-                    this.audio = new Audio(`/static/sounds/${track.file}`);
+                    // Pages that play music provide fingerprinted URLs for their tracks
+                    const urls = window.ORBITWELL_SOUND_URLS || {};
+                    this.audio = new Audio(urls[track.file] || `/static/sounds/${track.file}`);
 
                     // Create bound event handlers
                     this.onAudioEnded = () => this.next();
@@ -186,6 +189,8 @@ class OrbitWellApp {
         this.initializeAnimations();
         // Initialize page-specific functionality
         this.initializePageSpecificFeatures();
+        // Exchange localStorage changes with the server
+        this.syncWithServer();
     }
 
     highlightCurrentPage() {
@@ -333,8 +338,8 @@ class OrbitWellApp {
             // Show typing indicator
             this.showTypingIndicator();
 
-            // Send to API with session ID for context
-            const response = await fetch('/api/ask', {
+            // Send to API with session ID for context; the reply streams back as it is produced
+            const response = await fetch('/api/ask/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -349,13 +354,7 @@ class OrbitWellApp {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            const data = await response.json();
-
-            // Hide typing indicator
-            this.hideTypingIndicator();
-
-            // Process response
-            this.handleChatResponse(data);
+            await this.readChatStream(response);
 
         } catch (error) {
             console.error('Chat error:', error);
@@ -364,22 +363,88 @@ class OrbitWellApp {
         }
     }
 
-    handleChatResponse(data) {
-        let responseText = data.response;
+    // Reads the Server-Sent Events from /api/ask/stream and renders each
+    // event as soon as it arrives
+    async readChatStream(response) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let messageDiv = null;
 
-        // Add emergency styling if needed
-        if (data.type === 'emergency') {
-            responseText = `🚨 ${responseText}`;
+        const handleEvent = (event, data) => {
+            if (event === 'meta') {
+                this.hideTypingIndicator();
+                messageDiv = this.startStreamedMessage(data.type);
+            } else if (event === 'chunk' && messageDiv) {
+                this.appendStreamedText(messageDiv, data.text);
+            } else if (event === 'protocol') {
+                this.addChatMessage('assistant', `📋 Recommended actions:\n${data.protocol.join('\n• ')}`, 'protocol');
+            } else if (event === 'done' && messageDiv) {
+                this.finishStreamedMessage(messageDiv);
+            }
+        };
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                block.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                handleEvent(event, data ? JSON.parse(data) : {});
+            }
         }
+    }
 
-        this.addChatMessage('assistant', responseText, data.type);
+    startStreamedMessage(type) {
+        const chatMessages = document.getElementById('chat-messages');
+        if (!chatMessages) return null;
 
-        // Handle emergency protocols
-        if (data.protocol) {
-            setTimeout(() => {
-                this.addChatMessage('assistant', `📋 Recommended actions:\n${data.protocol.join('\n• ')}`, 'protocol');
-            }, 1000);
+        const messageDiv = document.createElement('div');
+        messageDiv.className = 'message assistant-message';
+        messageDiv.innerHTML = `
+            <div class="message-avatar">🤖</div>
+            <div class="message-content">
+                <p class="message-text"></p>
+                <div class="typing-cursor" style="display: inline;">|</div>
+            </div>
+        `;
+        chatMessages.appendChild(messageDiv);
+
+        // Add emergency styling if needed
+        if (type === 'emergency') {
+            this.appendStreamedText(messageDiv, '🚨 ');
         }
+        return messageDiv;
+    }
+
+    appendStreamedText(messageDiv, text) {
+        const textElement = messageDiv.querySelector('.message-text');
+        text.split('\n').forEach((line, i) => {
+            if (i > 0) textElement.appendChild(document.createElement('br'));
+            textElement.appendChild(document.createTextNode(line));
+        });
+        this.scrollChatToBottom();
+    }
+
+    finishStreamedMessage(messageDiv) {
+        const cursorElement = messageDiv.querySelector('.typing-cursor');
+        if (cursorElement) cursorElement.style.display = 'none';
+
+        // Add completion animation
+        messageDiv.style.animation = 'message-complete 0.5s ease-out';
+        setTimeout(() => {
+            messageDiv.style.animation = '';
+        }, 500);
     }
 
     addChatMessage(sender, content, type = 'normal') {
@@ -581,6 +646,7 @@ class OrbitWellApp {
 
     saveStreakData(data) {
         localStorage.setItem("orbitwell_streak", JSON.stringify(data));
+        this.markForSync('streak');
     }
 
     // ===============================
@@ -588,8 +654,9 @@ class OrbitWellApp {
     // ===============================
     addReminder(title, description, datetime) {
         const reminders = this.getReminders();
+        const id = Date.now();
         reminders.push({
-            id: Date.now(),
+            id,
             title,
             description,
             datetime,
@@ -597,6 +664,7 @@ class OrbitWellApp {
             completedDate: null
         });
         this.saveReminders(reminders);
+        this.markForSync('reminders', id, 'upsert');
         this.loadRemindersUI();
     }
 
@@ -612,6 +680,7 @@ class OrbitWellApp {
             }
         });
         this.saveReminders(reminders);
+        this.markForSync('reminders', id, 'upsert');
         this.updateStreak();  
         this.loadRemindersUI();
     }
@@ -620,6 +689,7 @@ class OrbitWellApp {
     deleteReminder(id) {
         const reminders = this.getReminders().filter(r => r.id !== id);
         this.saveReminders(reminders);
+        this.markForSync('reminders', id, 'delete');
         this.loadRemindersUI();
     }
 
@@ -745,6 +815,160 @@ class OrbitWellApp {
         if (completedTodayCountEl) completedTodayCountEl.textContent = completedToday.length;
     }
 
+    // The server pushes a 'due' event when a reminder's time arrives, so pages
+    // never have to re-scan their reminders on a timer. Only the pages that
+    // show reminders open the stream (each open stream is a connection the
+    // server keeps); they refresh by listening for 'orbitwell:reminder-due'.
+    listenForDueReminders() {
+        if (!window.EventSource) return;
+        const source = new EventSource('/api/reminders/events');
+        source.addEventListener('due', (event) => {
+            const reminder = JSON.parse(event.data);
+            this.showNotification(`⏰ ${reminder.title}`, 'info');
+            if ('Notification' in window && Notification.permission === 'granted') {
+                new Notification('OrbitWell reminder', { body: reminder.title });
+            }
+            document.dispatchEvent(new CustomEvent('orbitwell:reminder-due', { detail: reminder }));
+        });
+    }
+
+    // ========================================
+    // SYNC WITH THE SERVER (see sync.py)
+    // ========================================
+    // Local changes are queued in orbitwell_sync and sent with the version of
+    // the last sync; the reply only holds what changed on the server since.
+    // Neither side ever re-sends the full lists.
+
+    getSyncState() {
+        const data = localStorage.getItem('orbitwell_sync');
+        if (data) return JSON.parse(data);
+        // First sync on this browser: upload what is already stored locally
+        return { version: 0, pending: this.pendingEverything({ reminders: {}, gratitude: {}, streak: false }) };
+    }
+
+    // Queue every locally stored item for upload, on top of what is already queued
+    pendingEverything(pending) {
+        if (localStorage.getItem('orbitwell_streak') !== null) pending.streak = true;
+        this.getReminders().forEach(r => { pending.reminders[r.id] = 'upsert'; });
+        this.getGratitudeEntries().forEach(entry => { pending.gratitude[entry.date] = 'upsert'; });
+        return pending;
+    }
+
+    saveSyncState(state) {
+        localStorage.setItem('orbitwell_sync', JSON.stringify(state));
+    }
+
+    getGratitudeEntries() {
+        return JSON.parse(localStorage.getItem('orbitwell_gratitude') || '[]');
+    }
+
+    // Queue one change ('upsert' or 'delete'; the streak has no key) and sync shortly
+    markForSync(section, key, operation) {
+        const state = this.getSyncState();
+        if (section === 'streak') {
+            state.pending.streak = true;
+        } else {
+            state.pending[section][key] = operation;
+        }
+        this.saveSyncState(state);
+        clearTimeout(this.syncTimer);
+        this.syncTimer = setTimeout(() => this.syncWithServer(), 1000);
+    }
+
+    async syncWithServer() {
+        if (this.syncing) {
+            this.syncAgain = true;
+            return;
+        }
+        this.syncing = true;
+        const state = this.getSyncState();
+        const body = { since: state.version, database: state.database };
+        const reminders = this.getReminders();
+        const gratitude = this.getGratitudeEntries();
+        [['reminders', reminders, r => r.id, Number], ['gratitude', gratitude, entry => entry.date, String]]
+            .forEach(([section, items, keyOf, parseKey]) => {
+                const changes = Object.entries(state.pending[section]);
+                if (changes.length === 0) return;
+                body[section] = {
+                    upsert: items.filter(item => state.pending[section][keyOf(item)] === 'upsert'),
+                    delete: changes.filter(([, operation]) => operation === 'delete').map(([key]) => parseKey(key))
+                };
+            });
+        if (state.pending.streak) body.streak = this.getStreakData();
+
+        try {
+            const response = await fetch('/api/sync', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(body)
+            });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const result = await response.json();
+
+            // Changes made while the request was in flight stay queued
+            const latest = this.getSyncState();
+            ['reminders', 'gratitude'].forEach(section => {
+                Object.entries(state.pending[section]).forEach(([key, operation]) => {
+                    if (latest.pending[section][key] === operation) delete latest.pending[section][key];
+                });
+            });
+            if (state.pending.streak && JSON.stringify(this.getStreakData()) === JSON.stringify(body.streak)) {
+                latest.pending.streak = false;
+            }
+            latest.version = result.version;
+            latest.database = result.database;
+            this.saveSyncState(latest);
+            this.applySyncResult(result);
+        } catch (error) {
+            console.error('Sync failed:', error);  // Everything stays queued for the next sync
+        } finally {
+            this.syncing = false;
+            if (this.syncAgain) {
+                this.syncAgain = false;
+                this.syncWithServer();
+            }
+        }
+    }
+
+    applySyncResult(result) {
+        // A reset means the server's database was replaced (e.g. restored from
+        // a backup, or a new one) and may lack items this browser already synced. Local
+        // items are then kept over the server's and its deletions ignored;
+        // everything is uploaded again below, as on a first sync.
+        const merge = (items, changes, keyOf) => {
+            const byKey = new Map(items.map(item => [keyOf(item), item]));
+            if (result.reset) {
+                changes.upsert.forEach(item => { if (!byKey.has(keyOf(item))) byKey.set(keyOf(item), item); });
+            } else {
+                changes.delete.forEach(key => byKey.delete(key));
+                changes.upsert.forEach(item => byKey.set(keyOf(item), item));
+            }
+            return [...byKey.values()];
+        };
+        if (result.reminders || result.reset) {
+            this.saveReminders(merge(this.getReminders(), result.reminders || { upsert: [], delete: [] }, r => r.id));
+        }
+        if (result.gratitude || result.reset) {
+            const entries = merge(this.getGratitudeEntries(), result.gratitude || { upsert: [], delete: [] },
+                                  entry => entry.date);
+            entries.sort((a, b) => b.date.localeCompare(a.date));  // Newest first, as saveGratitude keeps them
+            localStorage.setItem('orbitwell_gratitude', JSON.stringify(entries));
+        }
+        if (result.streak && (!result.reset || localStorage.getItem('orbitwell_streak') === null)) {
+            localStorage.setItem('orbitwell_streak', JSON.stringify(result.streak));
+        }
+        if (result.reset) {
+            const state = this.getSyncState();
+            this.pendingEverything(state.pending);
+            this.saveSyncState(state);
+            this.syncAgain = true;  // Upload right after this sync finishes
+        }
+        if (result.reminders || result.gratitude || result.streak || result.reset) {
+            this.loadRemindersUI();
+            document.dispatchEvent(new CustomEvent('orbitwell:synced', { detail: result }));
+        }
+    }
+
     // Legacy compatibility methods
     loadReminders() {
         this.loadRemindersUI();
@@ -1522,33 +1746,44 @@ class OrbitWellApp {
         if (entryInput) entryInput.value = '';
     }
 
-    async loadJournalEntries() {
+    // Loads the newest page of entries, or the next older page when `more` is set.
+    // Pages are fetched by cursor so the full history is never downloaded at once.
+    async loadJournalEntries(more = false) {
+        let url = '/api/journal?limit=10';
+        if (more && this.journalCursor) {
+            url += `&before=${encodeURIComponent(this.journalCursor)}`;
+        }
+
         try {
-            const response = await fetch('/api/journal');
+            const response = await fetch(url);
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            const entries = await response.json();
-            this.displayJournalEntries(entries);
+            const page = await response.json();
+            this.journalCursor = page.next_before;
+            this.displayJournalEntries(page.entries, more);
         } catch (error) {
             console.error('Error loading journal entries:', error);
-            this.displayJournalEntries([]);
+            if (!more) this.displayJournalEntries([]);
             this.showNotification('Failed to load journal entries.', 'error');
         }
     }
 
-    displayJournalEntries(entries) {
+    displayJournalEntries(entries, append = false) {
         const list = document.getElementById('journal-list');
         if (!list) return;
 
-        if (!entries || entries.length === 0) {
+        const loadMoreBtn = document.getElementById('journal-load-more');
+        if (loadMoreBtn) loadMoreBtn.remove();
+
+        if (!append && (!entries || entries.length === 0)) {
             list.innerHTML = '<div class="no-entries">No journal entries yet. Start writing!</div>';
             return;
         }
 
-        list.innerHTML = '';
-        entries.slice(0, 10).forEach(entry => {
+        if (!append) list.innerHTML = '';
+        entries.forEach(entry => {
             const entryDiv = document.createElement('div');
             entryDiv.className = 'journal-entry-item';
             entryDiv.id = `journal-entry-${entry.id}`;
@@ -1564,6 +1799,15 @@ class OrbitWellApp {
 
             list.appendChild(entryDiv);
         });
+
+        if (this.journalCursor) {
+            const moreBtn = document.createElement('button');
+            moreBtn.id = 'journal-load-more';
+            moreBtn.className = 'cosmic-btn secondary';
+            moreBtn.textContent = 'Load older entries';
+            moreBtn.addEventListener('click', () => this.loadJournalEntries(true));
+            list.appendChild(moreBtn);
+        }
     }
 
     async deleteJournalEntry(id) {
@@ -1642,6 +1886,7 @@ class OrbitWellApp {
         const entries = JSON.parse(localStorage.getItem('orbitwell_gratitude') || '[]');
         entries.unshift(entry);
         localStorage.setItem('orbitwell_gratitude', JSON.stringify(entries));
+        this.markForSync('gratitude', entry.date, 'upsert');
 
         entryInput.value = '';
         this.showNotification('Gratitude saved! Keep focusing on the positive.', 'success');
@@ -0,0 +1,228 @@
+"""Delta sync of the browser's localStorage data (``POST /api/sync``).
+
+The pages keep reminders, gratitude entries and the completion streak in
+localStorage. Each page load sends only what changed locally since the last
+sync, together with the server version it last saw, and gets back only what
+changed on the server since then:
+
+    request:  {"since": 41, "database": "6f1c…",
+               "reminders": {"upsert": [{"id", "title", ...}], "delete": [id, ...]},
+               "gratitude": {"upsert": [{"content", "date"}], "delete": [date, ...]},
+               "streak": {"streak", "lastDate"}}
+    response: {"version": 44, "database": "6f1c…",
+               "reminders": {...}, "gratitude": {...}, "streak": {...}}
+
+Every section is optional and empty ones are left out of the response, so a
+sync with nothing to do is a few bytes each way. ``version`` comes from the
+``sync_changes`` log (see migrations.add_sync), which holds the version of
+the last change to every item, deletions included; the client sends it back
+as ``since`` next time. There is one server, so this single counter does
+the job of a version vector.
+
+Pushes and pulls happen in one ``BEGIN IMMEDIATE`` transaction. Items the
+client pushed win over concurrent server changes and are not echoed back.
+The streak is the exception: the one with the later ``lastDate`` wins, so a
+stale tab cannot reset it. ``database`` is a random id created with the
+server's first sync. If the client's id differs, or ``since`` is ahead of the
+server, the database was replaced. The response then has ``"reset": true``
+and every item. The client
+then keeps its own items, adds the server's, and uploads all of its items
+again, so restoring an older database loses nothing a browser still has.
+"""
+import json
+import uuid
+from datetime import datetime
+
+# Upper bound on the items one request may push
+SYNC_MAX_ITEMS = 10000
+
+SECTIONS = ('reminders', 'gratitude')
+
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def optional_str(value):
+    return value is None or isinstance(value, str)
+
+
+def validated_changes(data):
+    """Check a sync request body and return ``(since, changes)``; raises ValueError if it is malformed."""
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    since = data.get('since') or 0
+    if not is_int(since) or since < 0:
+        raise ValueError("since must be a non-negative integer")
+    if not optional_str(data.get('database')):
+        raise ValueError("database must be a string")
+    changes = {'database': data.get('database')}
+    count = 0
+    for section in SECTIONS:
+        part = data.get(section) or {}
+        if not isinstance(part, dict):
+            raise ValueError(f"{section} must be {{upsert, delete}}")
+        upserts, deletes = part.get('upsert') or [], part.get('delete') or []
+        if not isinstance(upserts, list) or not isinstance(deletes, list):
+            raise ValueError(f"{section}.upsert and {section}.delete must be lists")
+        count += len(upserts) + len(deletes)
+        changes[section] = {'upsert': upserts, 'delete': deletes}
+    if count > SYNC_MAX_ITEMS:
+        raise ValueError(f"At most {SYNC_MAX_ITEMS} changes per sync")
+
+    for number, item in enumerate(changes['reminders']['upsert'], 1):
+        if not isinstance(item, dict) or not is_int(item.get('id')) \
+                or not item.get('title') or not item.get('datetime'):
+            raise ValueError(f"Reminder {number}: id, title and datetime are required")
+        if not all(optional_str(item.get(field)) for field in ('title', 'description', 'datetime',
+                                                               'category', 'completedDate')):
+            raise ValueError(f"Reminder {number}: text fields must be strings")
+    if not all(is_int(key) for key in changes['reminders']['delete']):
+        raise ValueError("Reminder ids to delete must be integers")
+    for number, item in enumerate(changes['gratitude']['upsert'], 1):
+        if not isinstance(item, dict) or not isinstance(item.get('content'), str) or not item['content'] \
+                or not isinstance(item.get('date'), str) or not item['date']:
+            raise ValueError(f"Gratitude entry {number}: content and date are required")
+    if not all(isinstance(key, str) for key in changes['gratitude']['delete']):
+        raise ValueError("Gratitude dates to delete must be strings")
+
+    streak = data.get('streak')
+    if streak is not None:
+        if not isinstance(streak, dict) or not is_int(streak.get('streak')) or not optional_str(streak.get('lastDate')):
+            raise ValueError("streak must be {streak, lastDate}")
+        streak = {"streak": streak['streak'], "lastDate": streak.get('lastDate')}
+    changes['streak'] = streak
+    return since, changes
+
+
+def streak_rank(streak):
+    return (streak['lastDate'] or '', streak['streak'])
+
+
+class SyncStore:
+    """Applies a client's changes and collects the server's, in one transaction.
+
+    ``get_connection`` and ``on_change`` work as for ``state.ReminderStore``;
+    ``on_change`` is called when reminders were written.
+    """
+
+    def __init__(self, get_connection, on_change=None):
+        self._get_connection = get_connection
+        self._on_change = on_change or (lambda: None)
+
+    @staticmethod
+    def reminder_to_client(row):
+        return {
+            "id": row['client_id'],
+            "title": row['title'],
+            "description": row['description'],
+            "datetime": row['datetime'],
+            "category": row['category'],
+            "completed": bool(row['completed']),
+            "completedDate": row['completed_at'][:10] if row['completed_at'] else None
+        }
+
+    @staticmethod
+    def gratitude_to_client(row):
+        return {"content": row['content'], "date": row['created_at']}
+
+    def sync(self, since, changes):
+        """Apply ``changes`` (from ``validated_changes``) and return the response body."""
+        db = self._get_connection()
+        reminders, gratitude = changes['reminders'], changes['gratitude']
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            current = db.execute('SELECT COALESCE(MAX(version), 0) FROM sync_changes').fetchone()[0]
+            database = self._database_id(db)
+            reset = since > current or changes['database'] not in (None, database)
+            if reset:
+                since = 0
+
+            now = datetime.now().isoformat()
+            db.executemany('''INSERT INTO reminders
+                              (client_id, title, description, datetime, category, completed, completed_at, created_at)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                              ON CONFLICT (client_id) DO UPDATE SET
+                                  title = excluded.title, description = excluded.description,
+                                  datetime = excluded.datetime, category = excluded.category,
+                                  completed = excluded.completed,
+                                  -- Keep the full timestamp of a completion recorded by the REST routes
+                                  completed_at = CASE WHEN substr(completed_at, 1, 10) = excluded.completed_at
+                                                      THEN completed_at ELSE excluded.completed_at END''',
+                           ((r['id'], r['title'], r.get('description') or '', r['datetime'],
+                             r.get('category') or 'custom', bool(r.get('completed')),
+                             r.get('completedDate') if r.get('completed') else None, now)
+                            for r in reminders['upsert']))
+            db.executemany('DELETE FROM reminders WHERE client_id = ?', ((key,) for key in reminders['delete']))
+            db.executemany('''INSERT INTO gratitude_entries (content, created_at) VALUES (?, ?)
+                              ON CONFLICT (created_at) DO UPDATE SET content = excluded.content''',
+                           ((entry['content'], entry['date']) for entry in gratitude['upsert']))
+            db.executemany('DELETE FROM gratitude_entries WHERE created_at = ?',
+                           ((key,) for key in gratitude['delete']))
+            streak_sent = self._merge_streak(db, changes['streak'])
+
+            # Everything changed since the client's version, minus what it just sent
+            pushed = {'reminder': set(), 'gratitude': set()}
+            if not reset:
+                pushed['reminder'].update(r['id'] for r in reminders['upsert'])
+                pushed['reminder'].update(reminders['delete'])
+                pushed['gratitude'].update(entry['date'] for entry in gratitude['upsert'])
+                pushed['gratitude'].update(gratitude['delete'])
+            response = {"version": db.execute('SELECT COALESCE(MAX(version), 0) FROM sync_changes').fetchone()[0],
+                        "database": database}
+            if reset:
+                response["reset"] = True
+            for section, kind, table, column, to_client in (
+                    ('reminders', 'reminder', 'reminders', 'client_id', self.reminder_to_client),
+                    ('gratitude', 'gratitude', 'gratitude_entries', 'created_at', self.gratitude_to_client)):
+                upserts, deletes = [], []
+                for row in db.execute(f'''SELECT c.key AS sync_key, t.* FROM sync_changes c
+                                          LEFT JOIN {table} t ON t.{column} = c.key
+                                          WHERE c.kind = ? AND c.version > ? ORDER BY c.version''', (kind, since)):
+                    if row['sync_key'] in pushed[kind]:
+                        continue
+                    if row['id'] is None:
+                        deletes.append(row['sync_key'])
+                    else:
+                        upserts.append(to_client(row))
+                if upserts or deletes:
+                    response[section] = {"upsert": upserts, "delete": deletes}
+            if streak_sent is False or (streak_sent is None and db.execute(
+                    "SELECT 1 FROM sync_changes WHERE kind = 'value' AND key = 'streak' AND version > ?",
+                    (since,)).fetchone()):
+                streak = self._load_streak(db)
+                if streak is not None:
+                    response["streak"] = streak
+        if reminders['upsert'] or reminders['delete']:
+            self._on_change()
+        return response
+
+    @staticmethod
+    def _database_id(db):
+        row = db.execute("SELECT value FROM sync_values WHERE key = 'database'").fetchone()
+        if row is not None:
+            return row['value']
+        database = uuid.uuid4().hex
+        db.execute("INSERT INTO sync_values (key, value) VALUES ('database', ?)", (database,))
+        return database
+
+    @staticmethod
+    def _load_streak(db):
+        row = db.execute("SELECT value FROM sync_values WHERE key = 'streak'").fetchone()
+        return json.loads(row['value']) if row else None
+
+    def _merge_streak(self, db, streak):
+        """Store the client's streak unless the server's is newer.
+
+        Returns None if no streak was sent, True if it was stored and False if
+        the server's was kept (and must be sent back).
+        """
+        if streak is None:
+            return None
+        stored = self._load_streak(db)
+        if stored is not None and streak_rank(stored) > streak_rank(streak):
+            return False
+        if stored != streak:
+            db.execute("""INSERT INTO sync_values (key, value) VALUES ('streak', ?)
+                          ON CONFLICT (key) DO UPDATE SET value = excluded.value""", (json.dumps(streak),))
+        return True
@@ -0,0 +1,106 @@
+"""Tests for POST /api/sync (sync.py) and the sync triggers in migrations.py."""
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app({'DATABASE': str(tmp_path / 'orbitwell.db'), 'WARM_PAGES': False,
+                      'REMINDER_SCHEDULER': False})
+    return app.test_client()
+
+
+def reminder(id, title='Stretch', **fields):
+    return dict({'id': id, 'title': title, 'datetime': '2030-01-01T09:00'}, **fields)
+
+
+def sync(client, **body):
+    response = client.post('/api/sync', json=body)
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+def test_rest_reminders_do_not_collide_with_synced_ids(client):
+    # The first REST reminder gets row id 2, which the browser already uses
+    sync(client, reminders={'upsert': [reminder(2), reminder(3)]})
+    for _ in range(3):
+        response = client.post('/api/reminders', json={'title': 'Drink water', 'datetime': '2030-01-01T10:00'})
+        assert response.status_code == 201
+
+    ids = [r['id'] for r in sync(client)['reminders']['upsert']]
+    assert len(ids) == len(set(ids)) == 5
+    assert {2, 3} < set(ids)
+
+
+def test_push_then_pull_between_two_clients(client):
+    first = sync(client, reminders={'upsert': [reminder(1)]},
+                 gratitude={'upsert': [{'content': 'Sunshine', 'date': '2026-10-16T08:00:00Z'}]})
+    assert 'reminders' not in first  # a client's own changes are not echoed back
+
+    second = sync(client)
+    assert [r['id'] for r in second['reminders']['upsert']] == [1]
+    assert second['gratitude'] == {'upsert': [{'content': 'Sunshine', 'date': '2026-10-16T08:00:00Z'}],
+                                   'delete': []}
+
+    sync(client, since=second['version'], database=second['database'],
+         reminders={'upsert': [reminder(1, completed=True, completedDate='2026-10-17')]})
+    pulled = sync(client, since=first['version'], database=first['database'])
+    assert pulled['reminders']['upsert'][0]['completed'] is True
+    assert pulled['reminders']['upsert'][0]['completedDate'] == '2026-10-17'
+    assert 'gratitude' not in pulled
+
+    assert sync(client, since=pulled['version'], database=pulled['database']).keys() == {'version', 'database'}
+
+
+def test_rest_change_then_pull(client):
+    state = sync(client)
+    response = client.post('/api/reminders', json={'title': 'Drink water', 'datetime': '2030-01-01T10:00'})
+    reminder_id = response.json['reminder']['id']
+
+    pulled = sync(client, since=state['version'], database=state['database'])
+    [added] = pulled['reminders']['upsert']
+    assert added['title'] == 'Drink water'
+
+    client.put(f'/api/reminders/{reminder_id}', json={'completed': True})
+    pulled = sync(client, since=pulled['version'], database=pulled['database'])
+    [completed] = pulled['reminders']['upsert']
+    assert completed['id'] == added['id']
+    assert completed['completed'] is True and completed['completedDate'] is not None
+
+
+def test_deletes_are_pulled_as_tombstones(client):
+    state = sync(client, reminders={'upsert': [reminder(1), reminder(2)]},
+                 gratitude={'upsert': [{'content': 'Rain', 'date': '2026-10-16'}]})
+    other = sync(client)
+
+    sync(client, since=state['version'], database=state['database'],
+         reminders={'delete': [1]}, gratitude={'delete': ['2026-10-16']})
+    pulled = sync(client, since=other['version'], database=other['database'])
+    assert pulled['reminders'] == {'upsert': [], 'delete': [1]}
+    assert pulled['gratitude'] == {'upsert': [], 'delete': ['2026-10-16']}
+    assert [r['id'] for r in sync(client)['reminders']['upsert']] == [2]
+
+
+def test_reset_when_database_id_differs(client):
+    state = sync(client, reminders={'upsert': [reminder(1)]})
+
+    pulled = sync(client, since=state['version'], database='replaced')
+    assert pulled['reset'] is True
+    assert pulled['database'] == state['database']
+    assert [r['id'] for r in pulled['reminders']['upsert']] == [1]
+
+    assert sync(client, since=state['version'] + 100, database=state['database'])['reset'] is True
+    assert 'reset' not in sync(client, since=state['version'], database=state['database'])
+
+
+def test_later_streak_wins(client):
+    state = sync(client, streak={'streak': 5, 'lastDate': '2026-10-17'})
+    assert 'streak' not in state
+
+    stale = sync(client, since=state['version'], streak={'streak': 1, 'lastDate': '2026-10-10'})
+    assert stale['streak'] == {'streak': 5, 'lastDate': '2026-10-17'}
+
+    newer = sync(client, since=state['version'], streak={'streak': 6, 'lastDate': '2026-10-18'})
+    assert 'streak' not in newer
+    assert sync(client, since=state['version'])['streak'] == {'streak': 6, 'lastDate': '2026-10-18'}